@@ -1,18 +1,134 @@
+import hashlib
 import os
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from gtts import gTTS
 from pydub import AudioSegment
 from typing import List
-from config import AUDIO_OUTPUT_DIR, AUDIO_LANGUAGE
+from config import (AUDIO_OUTPUT_DIR, AUDIO_LANGUAGE, AUDIO_CACHE_DIR, AUDIO_MAX_WORKERS,
+                    AUDIO_MAX_CONCURRENT_REQUESTS, AUDIO_BACKEND, PIPER_VOICE_MODEL)
+
+# Optional local TTS engine (no network round-trips)
+try:
+    from piper import PiperVoice
+    PIPER_AVAILABLE = True
+except ImportError:
+    PIPER_AVAILABLE = False
+
+
+# Shared by every generator and thread so nested pools stay under the rate limit
+_tts_semaphore = threading.BoundedSemaphore(AUDIO_MAX_CONCURRENT_REQUESTS)
+
+# gTTS returns MPEG-2 Layer III, 24 kHz, mono, 32 kbps. A frame with an empty side
+# info block decodes to 576 samples (24 ms) of silence and can be spliced between
+# gTTS frames without re-encoding.
+_SILENT_MP3_FRAME = b"\xff\xf3\x44\xc4" + bytes(92)
+_SILENT_MP3_FRAME_MS = 24
+_POEM_GAP_MS = 2000  # Silence between poems in combined audio
 
 
 class AudioGenerator:
     """Generate audio output from poem verses."""
     
-    def __init__(self):
-        # Create output directory if it doesn't exist
+    # Gap between poems in combined audio, built once rather than per call
+    _silence = AudioSegment.silent(duration=_POEM_GAP_MS)
+    
+    def __init__(self, backend: str = AUDIO_BACKEND, voice_model: str = PIPER_VOICE_MODEL):
+        """
+        Initialize the audio generator.
+        
+        Args:
+            backend: TTS engine to use, "gtts" (Google, MP3) or "piper" (local, WAV)
+            voice_model: Path to the Piper ONNX voice (only used by the piper backend)
+        """
+        if backend not in ("gtts", "piper"):
+            raise ValueError(f"Unsupported audio backend: {backend}")
+        
+        self.backend = backend
+        self.extension = "wav" if backend == "piper" else "mp3"
+        self.voice_model = voice_model
+        self.voice = None
+        
+        if backend == "piper":
+            if not PIPER_AVAILABLE:
+                raise ImportError("Piper backend not available. Install with: pip install \"piper-tts>=1.3\"")
+            # Load the voice once; every synthesis call reuses the same ONNX session
+            self.voice = PiperVoice.load(voice_model)
+        
+        # Create output and cache directories if they don't exist
         os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
+        os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+    
+    def _output_path(self, output_filename: str) -> str:
+        """Build the output path with the extension produced by the backend."""
+        return os.path.join(AUDIO_OUTPUT_DIR, f"{output_filename}.{self.extension}")
+    
+    def _cache_path(self, text: str) -> str:
+        """Cache location for a piece of text, keyed by everything that affects the audio."""
+        voice = self.voice_model if self.backend == "piper" else AUDIO_LANGUAGE
+        key = hashlib.blake2b(f"{self.backend}|{voice}|{text}".encode("utf-8"),
+                              digest_size=16).hexdigest()
+        return os.path.join(AUDIO_CACHE_DIR, f"{key}.{self.extension}")
+    
+    @staticmethod
+    def _temp_path(path: str) -> str:
+        """Per-thread scratch path so concurrent writers never share a file."""
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    
+    def _synthesize_mp3(self, text: str) -> bytes:
+        """Synthesize a single utterance and return the raw MP3 bytes."""
+        cache_path = self._cache_path(text)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return f.read()
+        
+        buffer = BytesIO()
+        with _tts_semaphore:
+            gTTS(text=text, lang=AUDIO_LANGUAGE, slow=False).write_to_fp(buffer)
+        audio = buffer.getvalue()
+        
+        self._write_cache(cache_path, audio)
+        return audio
     
-    def generate_poem_audio(self, verses: List[str], output_filename: str, 
+    def _synthesize_wav(self, segments: List[str]) -> bytes:
+        """Synthesize segments locally with Piper and return one WAV file's bytes."""
+        text = "\n\n".join(segments)
+        cache_path = self._cache_path(text)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return f.read()
+        
+        # Local synthesis has no round-trip to hide, so one pass is enough
+        buffer = BytesIO()
+        with wave.open(buffer, 'wb') as wav_file:
+            # piper-tts >= 1.3 API; synthesize() now yields raw audio chunks instead
+            self.voice.synthesize_wav(text, wav_file)
+        audio = buffer.getvalue()
+        
+        self._write_cache(cache_path, audio)
+        return audio
+    
+    def _write_cache(self, cache_path: str, audio: bytes):
+        """Store synthesized audio; write then rename so readers never see a partial file."""
+        temp_path = self._temp_path(cache_path)
+        with open(temp_path, 'wb') as f:
+            f.write(audio)
+        os.replace(temp_path, cache_path)
+    
+    @staticmethod
+    def _poem_segments(verses: List[str], agent_name: str) -> List[str]:
+        """Utterances for a poem: optional intro followed by each non-empty verse."""
+        # Blank verses would still cost a TTS request, so drop them up front
+        verses = [verse for verse in verses if verse and verse.strip()]
+        if not verses:
+            raise ValueError("No verses to synthesize")
+        
+        intro = [f"Poem by {agent_name}"] if agent_name else []
+        return [*intro, *verses]
+    
+    def generate_poem_audio(self, verses: List[str], output_filename: str,
                            agent_name: str = "") -> str:
         """
         Generate audio file from poem verses.
@@ -21,23 +137,38 @@ class AudioGenerator:
             verses: List of verse strings
             output_filename: Name for output file (without extension)
             agent_name: Optional agent name to include in audio
-            
+        
         Returns:
             Path to generated audio file
         """
-        # Combine verses into full text
-        intro = f"Poem by {agent_name}\n\n" if agent_name else ""
-        full_text = intro + "\n\n".join(verses)
-        
-        # Generate audio
-        tts = gTTS(text=full_text, lang=AUDIO_LANGUAGE, slow=False)
-        
-        # Save audio file
-        output_path = os.path.join(AUDIO_OUTPUT_DIR, f"{output_filename}.mp3")
-        tts.save(output_path)
+        output_path = self._output_path(output_filename)
+        with open(output_path, 'wb') as f:
+            f.write(self._poem_audio(self._poem_segments(verses, agent_name)))
         
         return output_path
     
+    def _poem_audio(self, segments: List[str]) -> bytes:
+        """Synthesize segments with the configured backend into one audio file's bytes."""
+        if self.backend == "piper":
+            return self._synthesize_wav(segments)
+        return self._poem_mp3(segments)
+    
+    def _poem_mp3(self, segments: List[str]) -> bytes:
+        """Synthesize segments with gTTS and return one MP3 stream."""
+        # One gTTS request per verse so the round-trips run concurrently
+        max_workers = max(1, min(AUDIO_MAX_WORKERS, len(segments)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            audio_parts = list(executor.map(self._synthesize_mp3, segments))
+        
+        # MP3 frames are self-contained, so the segments concatenate directly
+        return b"".join(audio_parts)
+    
+    @staticmethod
+    def _silent_mp3(duration_ms: int) -> bytes:
+        """MP3 silence matching the gTTS stream format."""
+        num_frames = -(-duration_ms // _SILENT_MP3_FRAME_MS)  # Round up
+        return _SILENT_MP3_FRAME * num_frames
+    
     def generate_combined_audio(self, verses_a: List[str], verses_b: List[str],
                                agent_a_name: str, agent_b_name: str,
                                output_filename: str = "combined_poem") -> str:
@@ -50,35 +181,36 @@ class AudioGenerator:
             agent_a_name: Name of agent A
             agent_b_name: Name of agent B
             output_filename: Output filename
-            
+        
         Returns:
             Path to combined audio file
         """
-        # Generate individual audio files
-        audio_a_path = self.generate_poem_audio(verses_a, "temp_a", agent_a_name)
-        audio_b_path = self.generate_poem_audio(verses_b, "temp_b", agent_b_name)
-        
-        # Load audio files
-        audio_a = AudioSegment.from_mp3(audio_a_path)
-        audio_b = AudioSegment.from_mp3(audio_b_path)
+        output_path = self._output_path(output_filename)
+        segments_a = self._poem_segments(verses_a, agent_a_name)
+        segments_b = self._poem_segments(verses_b, agent_b_name)
         
-        # Add silence between poems
-        silence = AudioSegment.silent(duration=2000)  # 2 seconds
+        # Both poems synthesize concurrently and stay in memory
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future_a = executor.submit(self._poem_audio, segments_a)
+            future_b = executor.submit(self._poem_audio, segments_b)
+            audio_a = future_a.result()
+            audio_b = future_b.result()
         
-        # Combine audio
-        combined = audio_a + silence + audio_b
+        if self.backend == "gtts":
+            # Splice at frame boundaries instead of decoding and re-encoding
+            with open(output_path, 'wb') as f:
+                f.write(b"".join([audio_a, self._silent_mp3(_POEM_GAP_MS), audio_b]))
+            return output_path
         
-        # Export combined audio
-        output_path = os.path.join(AUDIO_OUTPUT_DIR, f"{output_filename}.mp3")
-        combined.export(output_path, format="mp3")
-        
-        # Clean up temporary files
-        os.remove(audio_a_path)
-        os.remove(audio_b_path)
+        # WAV headers can't be concatenated, so decode straight from memory
+        combined = (AudioSegment.from_file(BytesIO(audio_a), format=self.extension)
+                    + self._silence
+                    + AudioSegment.from_file(BytesIO(audio_b), format=self.extension))
+        combined.export(output_path, format=self.extension)
         
         return output_path
     
-    def generate_judgment_audio(self, judgment_text: str, 
+    def generate_judgment_audio(self, judgment_text: str,
                                 output_filename: str = "judgment") -> str:
         """
         Generate audio for judgment results.
@@ -86,11 +218,11 @@ class AudioGenerator:
         Args:
             judgment_text: Text of the judgment
             output_filename: Output filename
-            
+        
         Returns:
             Path to generated audio file
         """
-        tts = gTTS(text=judgment_text, lang=AUDIO_LANGUAGE, slow=False)
-        output_path = os.path.join(AUDIO_OUTPUT_DIR, f"{output_filename}.mp3")
-        tts.save(output_path)
+        output_path = self._output_path(output_filename)
+        with open(output_path, 'wb') as f:
+            f.write(self._poem_audio([judgment_text]))
         return output_path
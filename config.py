@@ -11,19 +11,51 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GOOGLE_MODEL = "models/gemini-2.5-flash"  # Free tier model
 GROQ_MODEL = "llama-3.3-70b-versatile"  # Fast and free
 JUDGE_MODEL = "models/gemini-flash-latest"  # Better reasoning for judging
+# Judgments sampled in one request and majority-voted. Values above 1 turn off the
+# streaming judge (scores are shown only after every candidate is in); 1 = single streamed judgment
+JUDGE_CANDIDATES = 3
+VISION_MODEL = "models/gemini-2.0-flash-thinking-exp"  # Image analysis
+
+# Response caches for development reruns (identical runs are served from disk
+# instead of the APIs, so the same document and context always give the same poems)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = ".langchain.db"  # LangChain SQLite cache for raw LLM calls
+VERSE_CACHE_PATH = ".verse_cache"  # shelve of finished verses, keyed by agent, model, context, facts and conversation
 
 # Embedding model
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 64  # Chunks per SentenceTransformer forward pass
+EMBEDDING_DEVICE = "cpu"  # Torch device for the embedding model
+EMBEDDING_CACHE_SIZE = 4096  # Chunk embeddings kept in memory, keyed by content hash
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # Query vectors reused across similarity searches
 
 # Vector store settings (FAISS)
 VECTOR_STORE_TABLE = "poem_knowledge_base"
 FAISS_INDEX_DIR = "faiss_index"  # Directory to store FAISS index
+FAISS_HNSW_M = 32  # Graph neighbours per vector
+FAISS_HNSW_EF_CONSTRUCTION = 200  # Build-time search depth (higher = better graph)
+FAISS_HNSW_EF_SEARCH = 64  # Query-time search depth (higher = better recall, slower)
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 
 # Audio settings
 AUDIO_OUTPUT_DIR = "audio_outputs"
 AUDIO_LANGUAGE = "en"
+AUDIO_CACHE_DIR = os.path.join(AUDIO_OUTPUT_DIR, ".cache")  # Synthesized speech keyed by text hash
+AUDIO_MAX_WORKERS = 8  # Max verses synthesized in parallel per poem
+AUDIO_MAX_CONCURRENT_REQUESTS = 4  # Global cap on in-flight gTTS requests (rate limit)
+AUDIO_BACKEND = os.getenv("AUDIO_BACKEND", "gtts")  # "gtts" (online) or "piper" (local)
+PIPER_VOICE_MODEL = os.getenv("PIPER_VOICE_MODEL", "en_US-lessac-medium.onnx")
+
+# Image analysis cache (results keyed by image content hash)
+VISION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-poet", "vision")
 
 # Document processing settings
+PDF_PARALLEL_MIN_PAGES = 20  # PyPDF2 fallback only: smaller PDFs aren't worth the process-pool startup cost
+PDF_MAX_WORKERS = 6  # PyPDF2 fallback only: page extraction scales roughly linearly up to ~6 processes
+OCR_MIN_TILE_HEIGHT = 800  # Images shorter than two tiles are OCR'd in one pass
+OCR_SEAM_SEARCH = 100  # Pixels either side of a strip boundary searched for a blank row to cut at
+OCR_MAX_DIMENSION = 2000  # Larger images are halved before OCR (recognition cost grows with pixels)
+OCR_OEM = 1  # LSTM engine only
+OCR_PSM = 6  # Assume a single uniform block of text
 SUPPORTED_EXTENSIONS = ['.pdf', '.docx', '.doc', '.txt', '.png', '.jpg', '.jpeg']
\ No newline at end of file
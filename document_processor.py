@@ -1,23 +1,68 @@
+import asyncio
+import hashlib
+import importlib.util
 import os
-from typing import List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from itertools import repeat
+from typing import List, Optional, TYPE_CHECKING
 from pathlib import Path
-import PyPDF2
-from docx import Document
-from PIL import Image
-import pytesseract
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document as LangchainDocument
-from config import CHUNK_SIZE, CHUNK_OVERLAP
+from config import (CHUNK_SIZE, CHUNK_OVERLAP, PDF_PARALLEL_MIN_PAGES, PDF_MAX_WORKERS,
+                    OCR_MIN_TILE_HEIGHT, OCR_SEAM_SEARCH, OCR_MAX_DIMENSION, OCR_OEM, OCR_PSM)
+
+# Format-specific libraries (PyPDF2, docx, PIL, pytesseract, ...) are imported
+# inside the extractor that needs them, so e.g. a TXT-only run never loads them
+if TYPE_CHECKING:
+    from PIL import Image
+
+# PyMuPDF (MuPDF C core) extracts text much faster than pure-Python PyPDF2
+PYMUPDF_AVAILABLE = importlib.util.find_spec("fitz") is not None
+
+# Async tesseract subprocesses let several image strips be OCR'd concurrently
+AIOPYTESSERACT_AVAILABLE = importlib.util.find_spec("aiopytesseract") is not None
+
+
+def _pdf_page_count(file_path: str) -> int:
+    """Count the pages of a PDF without extracting any text."""
+    if PYMUPDF_AVAILABLE:
+        import fitz
+        with fitz.open(file_path) as pdf:
+            return len(pdf)
+    
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract text from pages [start, stop) of a PDF.
+    
+    Module-level so it can be pickled into worker processes; each call opens
+    the file itself and only touches its own page range.
+    """
+    if PYMUPDF_AVAILABLE:
+        import fitz
+        with fitz.open(file_path) as pdf:
+            return [pdf[i].get_text("text") for i in range(start, stop)]
+    
+    # Fallback for environments without PyMuPDF binaries
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
 
 
 class DocumentProcessor:
     """Process various document types and extract text content."""
     
-    def __init__(self):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
-        )
+    # The splitter is stateless, so every processor shares one instance
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
     
     def process_document(self, file_path: str) -> List[LangchainDocument]:
         """
@@ -53,19 +98,40 @@ class DocumentProcessor:
         
         # Split into chunks
         chunks = self.text_splitter.split_documents([doc])
+        
+        # Content hash lets the vector store skip re-embedding chunks it has seen
+        for chunk in chunks:
+            chunk.metadata["hash"] = hashlib.blake2b(
+                chunk.page_content.encode("utf-8"), digest_size=16
+            ).hexdigest()
+        
         return chunks
     
     def _extract_pdf(self, file_path: str) -> str:
         """Extract text from PDF."""
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text.strip()
+        page_count = _pdf_page_count(file_path)
+        
+        # PyMuPDF extracts a long PDF faster than a worker pool starts (spawned
+        # workers re-import the whole app on Windows/macOS), so only the slow
+        # pure-Python PyPDF2 fallback is parallelized
+        if PYMUPDF_AVAILABLE or page_count <= PDF_PARALLEL_MIN_PAGES:
+            pages = _extract_pdf_pages(file_path, 0, page_count)
+        else:
+            # Pages are independent, so split them into one contiguous range per process
+            max_workers = min(os.cpu_count() or 1, PDF_MAX_WORKERS)
+            step = -(-page_count // max_workers)  # Round up
+            starts = list(range(0, page_count, step))
+            stops = [min(start + step, page_count) for start in starts]
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                page_ranges = executor.map(_extract_pdf_pages, repeat(file_path), starts, stops)
+                pages = [page for page_range in page_ranges for page in page_range]
+        
+        # Single join instead of repeated += (quadratic copying on long PDFs)
+        return "\n".join(pages).strip()
     
     def _extract_docx(self, file_path: str) -> str:
         """Extract text from DOCX."""
+        from docx import Document
         doc = Document(file_path)
         text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
         return text.strip()
@@ -78,8 +144,139 @@ class DocumentProcessor:
     def _extract_image(self, file_path: str) -> str:
         """Extract text from image using OCR."""
         try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image)
+            if AIOPYTESSERACT_AVAILABLE:
+                text = self._run_coroutine(self._extract_image_async(file_path))
+            else:
+                from PIL import Image
+                import pytesseract
+                image = self._preprocess_image(Image.open(file_path))
+                text = pytesseract.image_to_string(image, config=f"--oem {OCR_OEM} --psm {OCR_PSM}")
             return text.strip()
         except Exception as e:
             return f"Error extracting text from image: {str(e)}"
+    
+    @staticmethod
+    def _run_coroutine(coroutine):
+        """
+        Run a coroutine to completion from synchronous code.
+        
+        asyncio.run() refuses to start inside a running event loop (async
+        callers, Jupyter), so in that case the coroutine gets its own loop in
+        a worker thread.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+    
+    async def _extract_image_async(self, file_path: str) -> str:
+        """OCR horizontal strips of the image in concurrent tesseract processes."""
+        from PIL import Image
+        import aiopytesseract
+        image = self._preprocess_image(Image.open(file_path))
+        texts = await asyncio.gather(
+            *(aiopytesseract.image_to_string(self._to_png_bytes(tile), oem=OCR_OEM, psm=OCR_PSM)
+              for tile in self._split_image(image))
+        )
+        return "\n".join(text.strip() for text in texts)
+    
+    @classmethod
+    def _preprocess_image(cls, image: "Image.Image") -> "Image.Image":
+        """Grayscale, downscale and binarize an image so tesseract does less work."""
+        from PIL import Image
+        # Flatten transparency onto white (as pytesseract does); transparent pixels
+        # are usually stored as black, which would swallow dark text
+        if "A" in image.getbands() or "transparency" in image.info:
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        image = image.convert("L")
+        if max(image.size) > OCR_MAX_DIMENSION:
+            image = image.resize((image.width // 2, image.height // 2), Image.LANCZOS)
+        
+        threshold = cls._otsu_threshold(image.histogram())
+        return image.point(lambda p: 255 if p > threshold else 0)
+    
+    @staticmethod
+    def _otsu_threshold(histogram: List[int]) -> int:
+        """Gray level that maximizes between-class variance of a 256-bin histogram."""
+        total = sum(histogram)
+        weighted_total = sum(level * count for level, count in enumerate(histogram))
+        
+        weight_bg = 0
+        weighted_bg = 0
+        best_threshold = 0
+        best_variance = 0.0
+        for level, count in enumerate(histogram):
+            weight_bg += count
+            weight_fg = total - weight_bg
+            if weight_bg == 0:
+                continue
+            if weight_fg == 0:
+                break
+            
+            weighted_bg += level * count
+            mean_bg = weighted_bg / weight_bg
+            mean_fg = (weighted_total - weighted_bg) / weight_fg
+            variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+            if variance > best_variance:
+                best_variance = variance
+                best_threshold = level
+        
+        return best_threshold
+    
+    @classmethod
+    def _split_image(cls, image: "Image.Image") -> List["Image.Image"]:
+        """
+        Split a binarized image into horizontal strips, one per core at most.
+        
+        Strips are only cut at blank rows, so no text line is split across two
+        strips or OCR'd twice. A boundary with no blank row nearby is skipped
+        and its neighbouring strips stay joined.
+        """
+        num_tiles = min(os.cpu_count() or 1, image.height // OCR_MIN_TILE_HEIGHT)
+        if num_tiles <= 1:
+            return [image]
+        
+        tile_height = -(-image.height // num_tiles)  # Round up
+        cuts = [0]
+        for target in range(tile_height, image.height, tile_height):
+            cut = cls._blank_row_near(image, target, low=cuts[-1] + 1)
+            if cut is not None:
+                cuts.append(cut)
+        cuts.append(image.height)
+        
+        return [image.crop((0, top, image.width, bottom)) for top, bottom in zip(cuts, cuts[1:])]
+    
+    @staticmethod
+    def _blank_row_near(image: "Image.Image", target: int, low: int) -> Optional[int]:
+        """
+        Closest uniform (text-free) row to target, within OCR_SEAM_SEARCH pixels.
+        
+        Args:
+            image: Binarized image
+            target: Preferred row
+            low: Smallest acceptable row
+            
+        Returns:
+            Row index, or None if every nearby row contains ink
+        """
+        high = image.height - 1
+        for offset in range(OCR_SEAM_SEARCH + 1):
+            for y in (target - offset, target + offset):
+                if low <= y <= high:
+                    darkest, lightest = image.crop((0, y, image.width, y + 1)).getextrema()
+                    if darkest == lightest:
+                        return y
+        return None
+    
+    @staticmethod
+    def _to_png_bytes(image: "Image.Image") -> bytes:
+        """Encode an image as PNG for tesseract's stdin."""
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
@@ -3,6 +3,7 @@ Example usage of the AI Poem Generator system.
 This script demonstrates how to use the system programmatically.
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from document_processor import DocumentProcessor
 from vector_store_manager import VectorStoreManager
 from poem_workflow import PoemWorkflow
@@ -154,20 +155,28 @@ def example_iterative_generation():
     best_score = 0
     best_result = None
     
-    for context in contexts:
+    def generate(context):
         print(f"\n🎨 Generating for: {context}")
+        # One workflow per thread so no graph state is shared between runs
         workflow = PoemWorkflow(retriever, num_verses=4)
-        results = workflow.run(context)
-        
-        score_a = results["judgment"].get("total_a", 0)
-        score_b = results["judgment"].get("total_b", 0)
-        max_score = max(score_a, score_b)
-        
-        print(f"  Best score: {max_score}/100")
+        return workflow.run(context)
+    
+    # Contexts are independent LLM runs, so let their API calls overlap
+    with ThreadPoolExecutor(max_workers=len(contexts)) as executor:
+        futures = [executor.submit(generate, context) for context in contexts]
         
-        if max_score > best_score:
-            best_score = max_score
-            best_result = results
+        for future in as_completed(futures):
+            results = future.result()
+            
+            score_a = results["judgment"].get("total_a", 0)
+            score_b = results["judgment"].get("total_b", 0)
+            max_score = max(score_a, score_b)
+            
+            print(f"  Best score for {results['context']}: {max_score}/100")
+            
+            if max_score > best_score:
+                best_score = max_score
+                best_result = results
     
     print(f"\n🏆 Best overall poem scored: {best_score}/100")
     print(f"   Context: {best_result['context'][:50]}...")
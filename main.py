@@ -1,13 +1,23 @@
 import argparse
+import hashlib
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from document_processor import DocumentProcessor
 from vector_store_manager import VectorStoreManager
 from poem_workflow import PoemWorkflow
 from audio_generator import AudioGenerator
+from config import VISION_MODEL, VISION_CACHE_DIR
 from langchain_core.documents import Document as LangchainDocument
 
+# Faster JSON serialization (falls back to the standard library)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # For comprehensive image analysis
 try:
     import google.generativeai as genai
@@ -18,6 +28,44 @@ except ImportError:
     print("⚠️  Vision API not available. Install with: pip install google-generativeai")
 
 
+def image_cache_key(image_path: str) -> str:
+    """
+    Hash an image file together with the vision model name.
+    
+    The file is read in 64 KB blocks so large images are never fully loaded.
+    """
+    h = hashlib.blake2b(VISION_MODEL.encode("utf-8"), digest_size=16)
+    with open(image_path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_cached_analysis(cache_file: str) -> dict:
+    """Read a cached image analysis; a missing or unreadable file counts as a miss."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if not isinstance(cached, dict) or "combined_context" not in cached:
+        return None
+    return cached
+
+
+def save_cached_analysis(cache_file: str, result: dict):
+    """Store an image analysis; write then rename so readers never see a partial file."""
+    try:
+        os.makedirs(VISION_CACHE_DIR, exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        print(f"⚠️  Could not cache image analysis: {e}")
+
+
 def analyze_image_comprehensively(image_path: str, google_api_key: str) -> dict:
     """
     Comprehensive image analysis using Google Gemini Vision API.
@@ -32,40 +80,36 @@ def analyze_image_comprehensively(image_path: str, google_api_key: str) -> dict:
     """
     if not VISION_AVAILABLE:
         return None
-        
+    
     try:
+        # Results depend only on the image bytes and the model, so reuse earlier runs.
+        # Hashing reads the image, so it stays inside the try: an unreadable file
+        # must fail like any other analysis error (the caller then falls back to OCR)
+        cache_file = os.path.join(VISION_CACHE_DIR, f"{image_cache_key(image_path)}.json")
+        
+        cached = load_cached_analysis(cache_file)
+        if cached is not None:
+            print(f"\n✅ Loaded cached image analysis ({len(cached['combined_context'])} chars)")
+            return {**cached, "image_path": image_path}
+        
         print(f"\n🔍 Performing comprehensive AI image analysis...")
         print("   (Analyzing both visual content AND any text in the image)")
         
         # Configure Gemini
         genai.configure(api_key=google_api_key)
-        model = genai.GenerativeModel('models/gemini-2.0-flash-thinking-exp')
+        model = genai.GenerativeModel(VISION_MODEL)
         
         # Load image
         image = Image.open(image_path)
         
-        # Step 1: Extract any text from the image
-        print("  📝 Extracting text from image...")
+        # Step 1: Prompt to extract any text from the image
         text_prompt = """Extract ALL text visible in this image. 
         If there is text, transcribe it exactly as it appears.
         If there is NO text or very minimal text (less than 5 words), simply respond with: [NO TEXT]
         
         Return only the extracted text, nothing else."""
         
-        text_response = model.generate_content([text_prompt, image])
-        extracted_text = text_response.text.strip()
-        
-        has_text = extracted_text and "[NO TEXT]" not in extracted_text.upper() and len(extracted_text) > 10
-        
-        if has_text:
-            print(f"  ✅ Found text in image ({len(extracted_text)} characters)")
-            print(f"     Preview: {extracted_text[:100]}...")
-        else:
-            print(f"  ℹ️  No significant text found in image")
-            extracted_text = ""
-        
-        # Step 2: Analyze visual content
-        print("  🎨 Analyzing visual content...")
+        # Step 2: Prompt to analyze visual content
         visual_prompt = """Analyze this image's visual content in detail. Provide a comprehensive description 
         covering:
         
@@ -83,8 +127,23 @@ def analyze_image_comprehensively(image_path: str, google_api_key: str) -> dict:
         
         Note: Focus ONLY on visual elements. Do NOT describe any text you see - that's handled separately."""
         
-        visual_response = model.generate_content([visual_prompt, image])
-        visual_analysis = visual_response.text.strip()
+        # Both requests are independent, so send them concurrently
+        print("  📝 Extracting text from image...")
+        print("  🎨 Analyzing visual content...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            text_future = executor.submit(model.generate_content, [text_prompt, image])
+            visual_future = executor.submit(model.generate_content, [visual_prompt, image])
+            extracted_text = text_future.result().text.strip()
+            visual_analysis = visual_future.result().text.strip()
+        
+        has_text = extracted_text and "[NO TEXT]" not in extracted_text.upper() and len(extracted_text) > 10
+        
+        if has_text:
+            print(f"  ✅ Found text in image ({len(extracted_text)} characters)")
+            print(f"     Preview: {extracted_text[:100]}...")
+        else:
+            print(f"  ℹ️  No significant text found in image")
+            extracted_text = ""
         
         print(f"  ✅ Generated visual analysis ({len(visual_analysis)} characters)")
         
@@ -113,7 +172,7 @@ This image is primarily visual without significant text content. The poetry shou
         print(f"   Total: {len(combined_context)} chars")
         print(f"\nPreview: {combined_context[:200]}...\n")
         
-        return {
+        result = {
             "visual_analysis": visual_analysis,
             "extracted_text": extracted_text,
             "combined_context": combined_context,
@@ -122,6 +181,11 @@ This image is primarily visual without significant text content. The poetry shou
             "success": True
         }
         
+        # Only successful analyses are cached
+        save_cached_analysis(cache_file, result)
+        
+        return result
+        
     except Exception as e:
         print(f"❌ Comprehensive image analysis failed: {e}")
         return {"success": False, "error": str(e)}
@@ -320,6 +384,37 @@ def main():
     
     print_judgment(results["judgment"])
     
+    # Start audio generation (optional) first so the TTS network calls
+    # overlap with writing the result files below
+    audio_executor = None
+    audio_futures = {}
+    if args.audio:
+        print("\n🎵 Generating audio output in the background...")
+        try:
+            audio_gen = AudioGenerator()
+            executor = ThreadPoolExecutor(max_workers=3)
+            audio_futures = {
+                executor.submit(
+                    audio_gen.generate_poem_audio,
+                    results["google_poem"]["verses"],
+                    "poem_google",
+                    results["google_poem"]["agent"]
+                ): "Google poem audio",
+                executor.submit(
+                    audio_gen.generate_poem_audio,
+                    results["groq_poem"]["verses"],
+                    "poem_groq",
+                    results["groq_poem"]["agent"]
+                ): "Groq poem audio",
+                executor.submit(
+                    audio_gen.generate_judgment_audio,
+                    results["judgment"].get("full_judgment", "Judgment not available")
+                ): "Judgment audio",
+            }
+            audio_executor = executor
+        except Exception as e:
+            print(f"⚠️  Warning: Could not generate audio: {str(e)}")
+    
     # Step 6: Save results
     print("💾 Saving results...")
     results_file = os.path.join(args.output, "poem_results.json")
@@ -333,8 +428,13 @@ def main():
         "num_verses": args.verses
     }
     
-    with open(results_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    if ORJSON_AVAILABLE:
+        Path(results_file).write_bytes(
+            orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
+    else:
+        with open(results_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"✅ Results saved to: {results_file}")
     
     # Save poems as text
@@ -368,37 +468,18 @@ def main():
     
     print(f"✅ Poems saved to: {poems_file}")
     
-    # Step 7: Generate audio (optional)
-    if args.audio:
-        print("\n🎵 Generating audio output...")
+    # Step 7: Collect audio (optional)
+    if audio_executor is not None:
         try:
-            audio_gen = AudioGenerator()
-            
-            # Generate audio for each poem
-            audio_a = audio_gen.generate_poem_audio(
-                results["google_poem"]["verses"],
-                "poem_google",
-                results["google_poem"]["agent"]
-            )
-            print(f"✅ Google poem audio: {audio_a}")
-            
-            audio_b = audio_gen.generate_poem_audio(
-                results["groq_poem"]["verses"],
-                "poem_groq",
-                results["groq_poem"]["agent"]
-            )
-            print(f"✅ Groq poem audio: {audio_b}")
-            
-            # Generate judgment audio
-            judgment_audio = audio_gen.generate_judgment_audio(
-                results["judgment"].get("full_judgment", "Judgment not available")
-            )
-            print(f"✅ Judgment audio: {judgment_audio}")
+            for future in as_completed(audio_futures):
+                print(f"✅ {audio_futures[future]}: {future.result()}")
             
             print("\n🎧 All audio files generated successfully!")
             
         except Exception as e:
             print(f"⚠️  Warning: Could not generate audio: {str(e)}")
+        finally:
+            audio_executor.shutdown(cancel_futures=True)
     
     print("\n" + "="*60)
     print("✨ Process completed successfully!")
@@ -2,8 +2,85 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from typing import List, Dict
-from config import GOOGLE_API_KEY, GROQ_API_KEY, GOOGLE_MODEL, GROQ_MODEL, JUDGE_MODEL
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_community.cache import SQLiteCache
+import asyncio
+import hashlib
+import re
+import shelve
+import threading
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, List, Dict, Optional, Tuple
+from config import (GOOGLE_API_KEY, GROQ_API_KEY, GOOGLE_MODEL, GROQ_MODEL, JUDGE_MODEL,
+                    JUDGE_CANDIDATES, LLM_CACHE_ENABLED, LLM_CACHE_PATH, VERSE_CACHE_PATH)
+
+
+# shelve isn't safe for concurrent writers, and agents generate in parallel
+_verse_cache_lock = threading.Lock()
+
+
+# Patterns for the judge's output format (see JudgeAgent._build_prompt). Labels may
+# come wrapped in markdown ("**TOTAL:** 80/100"), so anything non-alphanumeric
+# is allowed between a label and its number.
+_TOTAL_RE = re.compile(r"TOTAL\W*(\d+)\s*/\s*100")
+_WINNER_RE = re.compile(r"^\W*WINNER:\W*(.+)", re.MULTILINE)
+_JUSTIFICATION_RE = re.compile(
+    r"JUSTIFICATION:\**\s*(.*?)\s*(?:\**STRENGTHS OF WINNER:|$)", re.DOTALL
+)
+_SCORES_RE = re.compile(
+    r"(Factual Accuracy|Literary Quality|Coherence|Creativity|Rhythm & Sound)\W*(\d+)\s*/\s*\d+"
+)
+
+# Unmatched streamed text kept between chunks; enough to hold a TOTAL line split mid-chunk
+_TOTAL_WINDOW = 64
+
+# "Poem A" / "Poem B" inside a winner line, however it is decorated
+_WINNER_POEM_RE = re.compile(r"Poem\s*([AB])\b", re.IGNORECASE)
+
+
+def _cached_retrieval(retriever) -> Callable[[str], Tuple[str, ...]]:
+    """
+    Memoize retriever lookups by query.
+    
+    Every verse (and the judge) queries with the same context, so only the
+    first call pays for the embedding + FAISS search. Page contents are
+    returned as a tuple so the cached value can't be mutated by callers.
+    """
+    @lru_cache(maxsize=256)
+    def retrieve(query: str) -> Tuple[str, ...]:
+        return tuple(doc.page_content for doc in retriever.invoke(query))
+    
+    return retrieve
+
+
+def enable_llm_cache():
+    """
+    Answer repeated prompts (reruns, development iterations) from disk.
+    
+    Called by the entry points rather than at import, so anything that only
+    imports this module (e.g. the API checks in test_system.py) still talks
+    to the real providers. Does nothing unless LLM_CACHE_ENABLED is set.
+    """
+    if LLM_CACHE_ENABLED and get_llm_cache() is None:
+        set_llm_cache(SQLiteCache(database_path=LLM_CACHE_PATH))
+
+
+def _cached_verse(key: str) -> Optional[str]:
+    """Look up a finished verse in the on-disk verse cache (if enabled)."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _verse_cache_lock, shelve.open(VERSE_CACHE_PATH) as cache:
+        return cache.get(key)
+
+
+def _store_verse(key: str, verse: str):
+    """Save a finished verse to the on-disk verse cache (if enabled)."""
+    if not LLM_CACHE_ENABLED:
+        return
+    with _verse_cache_lock, shelve.open(VERSE_CACHE_PATH) as cache:
+        cache[key] = verse
 
 
 class PoemAgent:
@@ -12,31 +89,118 @@ class PoemAgent:
     def __init__(self, agent_name: str, llm, retriever):
         self.agent_name = agent_name
         self.llm = llm
+        # ChatGroq names this field model_name, ChatGoogleGenerativeAI model
+        self.model_name = getattr(llm, "model_name", None) or getattr(llm, "model", "")
         self.retriever = retriever
+        self._retrieve = _cached_retrieval(retriever)
         self.output_parser = StrOutputParser()
+        
+        # The prompt | llm | parser chain is the same for every call, so build it once
+        self._chain = self._build_chain()
     
-    def generate_verse(self, context: str, previous_verses: List[str] = None) -> str:
+    def generate_verse(self, context: str, previous_verses: List[str] = None,
+                       conversation: str = None) -> str:
         """
         Generate a verse based on context and previous verses.
         
         Args:
             context: Factual context from the document
             previous_verses: List of previously generated verses
+            conversation: Pre-formatted "Line N: ..." history (optional; takes
+                precedence over previous_verses and skips re-formatting them)
             
         Returns:
             Generated verse
         """
+        conversation = self._format_conversation(previous_verses, conversation)
+        
         # Retrieve relevant facts
-        relevant_docs = self.retriever.invoke(context)
-        facts = "\n".join([doc.page_content for doc in relevant_docs[:2]])
+        facts = self.retrieve_facts(context, k=2)
+        
+        key = self._verse_cache_key(context, facts, conversation)
+        cached = _cached_verse(key)
+        if cached is not None:
+            return cached
+        
+        verse = self._chain.invoke(self._verse_inputs(context, facts, conversation)).strip()
+        _store_verse(key, verse)
+        return verse
+    
+    async def agenerate_verse(self, context: str, previous_verses: List[str] = None,
+                              conversation: str = None) -> str:
+        """
+        Async version of generate_verse, so several agents can wait on their
+        LLM providers at the same time.
+        
+        Args:
+            context: Factual context from the document
+            previous_verses: List of previously generated verses
+            conversation: Pre-formatted "Line N: ..." history (optional)
+            
+        Returns:
+            Generated verse
+        """
+        conversation = self._format_conversation(previous_verses, conversation)
         
-        # Build conversation history
-        conversation = ""
+        # FAISS search and query embedding are blocking; run them in a worker
+        # thread so concurrent agents can retrieve at the same time
+        facts = await asyncio.to_thread(self.retrieve_facts, context, 2)
+        
+        key = self._verse_cache_key(context, facts, conversation)
+        cached = await asyncio.to_thread(_cached_verse, key)
+        if cached is not None:
+            return cached
+        
+        verse = await self._chain.ainvoke(self._verse_inputs(context, facts, conversation))
+        verse = verse.strip()
+        await asyncio.to_thread(_store_verse, key, verse)
+        return verse
+    
+    def retrieve_facts(self, context: str, k: int) -> str:
+        """
+        Top-k facts for a context, joined one per line.
+        
+        Args:
+            context: Query for the retriever
+            k: Number of documents to include
+            
+        Returns:
+            Newline-separated document contents
+        """
+        return "\n".join(self._retrieve(context)[:k])
+    
+    @staticmethod
+    def _format_conversation(previous_verses: List[str] = None,
+                             conversation: str = None) -> str:
+        """Conversation history as "Line N: ..." lines, reusing a pre-formatted one if given."""
+        if conversation:
+            return conversation
         if previous_verses:
-            conversation = "\n".join([f"Line {i+1}: {verse}" 
-                                     for i, verse in enumerate(previous_verses)])
+            return "\n".join([f"Line {i+1}: {verse}" 
+                              for i, verse in enumerate(previous_verses)])
+        return ""
+    
+    def _verse_cache_key(self, context: str, facts: str, conversation: str) -> str:
+        """
+        Verse cache key; a hit skips the whole chain, not just the LLM call.
         
-        # Create prompt
+        The retrieved facts and the model are part of the key, so the same
+        context over a different document, or with a different model, misses.
+        """
+        return hashlib.sha256(
+            f"{self.agent_name}|{self.model_name}|{context}|{facts}|{conversation}".encode("utf-8")
+        ).hexdigest()
+    
+    def _verse_inputs(self, context: str, facts: str, conversation: str) -> dict:
+        """Build the prompt variables for a verse."""
+        return {
+            "facts": facts,
+            "conversation": conversation if conversation else "This is the first line.",
+            "context": context
+        }
+    
+    def _build_chain(self):
+        """Create the prompt | llm | parser chain for verse generation."""
         prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a talented poet. Create ONE poetic line that:
 1. Is factually grounded in the provided context
@@ -55,15 +219,7 @@ Create the next line of the poem. Output ONLY the verse, nothing else."""),
             ("human", "Create the next poetic line based on: {context}")
         ])
         
-        # Generate verse
-        chain = prompt | self.llm | self.output_parser
-        verse = chain.invoke({
-            "facts": facts,
-            "conversation": conversation if conversation else "This is the first line.",
-            "context": context
-        })
-        
-        return verse.strip()
+        return prompt | self.llm | self.output_parser
 
 
 class GooglePoemAgent(PoemAgent):
@@ -102,10 +258,26 @@ class JudgeAgent:
             max_output_tokens=4096  # Add this instead of max_retries
         )
         self.retriever = retriever
+        self._retrieve = _cached_retrieval(retriever)
         self.output_parser = StrOutputParser()
+        
+        # Several candidate judgments from one request, for majority voting
+        self.voting_llm = None
+        if JUDGE_CANDIDATES > 1:
+            self.voting_llm = ChatGoogleGenerativeAI(
+                model=JUDGE_MODEL,
+                google_api_key=GOOGLE_API_KEY,
+                temperature=0.3,
+                max_output_tokens=4096,
+                n=JUDGE_CANDIDATES
+            )
+        
+        # The prompt and chain are the same for every call, so build them once
+        self._prompt = self._build_prompt()
+        self._chain = self._build_chain()
     
     def judge_verses(self, verses_a: List[str], verses_b: List[str], 
-                     context: str) -> Dict[str, any]:
+                     context: str, facts: str = None) -> Dict[str, any]:
         """
         Judge two sets of verses based on multiple criteria.
         
@@ -120,19 +292,146 @@ class JudgeAgent:
             verses_a: Verses from first agent
             verses_b: Verses from second agent
             context: Original context/theme
+            facts: Source facts already retrieved for this context (optional,
+                looked up from the retriever when not given)
+            
+        Returns:
+            Dictionary with detailed judgment
+        """
+        inputs = self._judge_inputs(verses_a, verses_b, context, facts)
+        
+        if self.voting_llm is not None:
+            # One round-trip returns every candidate; vote instead of trusting one sample
+            response = self.voting_llm.generate([self._prompt.format_messages(**inputs)])
+            return self._vote([generation.text for generation in response.generations[0]])
+        
+        judgment = self._chain.invoke(inputs)
+        
+        # Parse judgment
+        result = self._parse_judgment(judgment)
+        result["full_judgment"] = judgment
+        
+        return result
+    
+    async def ajudge_verses(self, verses_a: List[str], verses_b: List[str],
+                            context: str, facts: str = None) -> Dict[str, any]:
+        """
+        Async version of judge_verses.
+        
+        With JUDGE_CANDIDATES > 1 the candidates are requested in one call and
+        majority-voted, as in judge_verses. With a single candidate the response
+        is streamed instead: once both totals have been seen they are reported
+        straight away rather than after the full response.
+        
+        Args:
+            verses_a: Verses from first agent
+            verses_b: Verses from second agent
+            context: Original context/theme
+            facts: Source facts already retrieved for this context (optional)
             
         Returns:
             Dictionary with detailed judgment
         """
+        if facts is None:
+            # Keep the blocking retriever call off the event loop
+            facts = await asyncio.to_thread(lambda: "\n".join(self._retrieve(context)[:3]))
+        inputs = self._judge_inputs(verses_a, verses_b, context, facts)
+        
+        if self.voting_llm is not None:
+            # Candidates arrive together, so there is nothing to stream
+            response = await self.voting_llm.agenerate([self._prompt.format_messages(**inputs)])
+            result = self._vote([generation.text for generation in response.generations[0]])
+            print(f"   📊 Scores in: Poem A {result['total_a']}/100, "
+                  f"Poem B {result['total_b']}/100 (votes: {result.get('votes', {})})")
+            return result
+        
+        chunks = []
+        window = ""
+        totals = []
+        async for chunk in self._chain.astream(inputs):
+            chunks.append(chunk)
+            
+            if len(totals) < 2:
+                # Only search text not already matched, so each chunk costs O(chunk)
+                window += chunk
+                end = 0
+                for match in _TOTAL_RE.finditer(window):
+                    totals.append(match.group(1))
+                    end = match.end()
+                window = window[end:][-_TOTAL_WINDOW:]
+                
+                if len(totals) >= 2:
+                    print(f"   📊 Scores in: Poem A {totals[0]}/100, Poem B {totals[1]}/100")
+        
+        judgment = "".join(chunks)
+        
+        # Parse judgment
+        result = self._parse_judgment(judgment)
+        result["full_judgment"] = judgment
+        
+        return result
+    
+    def _judge_inputs(self, verses_a: List[str], verses_b: List[str],
+                      context: str, facts: str = None) -> dict:
+        """Build the prompt variables for a judgment."""
         # Retrieve relevant facts for verification
-        relevant_docs = self.retriever.invoke(context)
-        facts = "\n".join([doc.page_content for doc in relevant_docs[:3]])
+        if facts is None:
+            facts = "\n".join(self._retrieve(context)[:3])
         
         # Format verses
         poem_a = "\n".join([f"{i+1}. {v}" for i, v in enumerate(verses_a)])
         poem_b = "\n".join([f"{i+1}. {v}" for i, v in enumerate(verses_b)])
         
-        prompt = ChatPromptTemplate.from_messages([
+        return {
+            "facts": facts,
+            "poem_a": poem_a,
+            "poem_b": poem_b,
+            "context": context
+        }
+    
+    def _vote(self, judgments: List[str]) -> Dict[str, any]:
+        """
+        Combine candidate judgments by majority vote on the winner.
+        
+        Among the candidates that agree with the majority, the one with the
+        median score margin is returned whole, so its totals, criterion scores
+        and justification always agree with its winner.
+        
+        Args:
+            judgments: Raw judgment texts
+            
+        Returns:
+            Dictionary with detailed judgment plus per-winner vote counts
+        """
+        results = [self._parse_judgment(judgment) for judgment in judgments]
+        for result, judgment in zip(results, judgments):
+            result["full_judgment"] = judgment
+        
+        votes = Counter(self._winner_key(r["winner"]) for r in results if r["winner"])
+        if not votes:
+            return results[0]
+        
+        majority = votes.most_common(1)[0][0]
+        agreeing = [r for r in results if r["winner"] and self._winner_key(r["winner"]) == majority]
+        agreeing.sort(key=lambda r: r["total_a"] - r["total_b"])
+        result = agreeing[(len(agreeing) - 1) // 2]
+        result["votes"] = dict(votes)
+        
+        return result
+    
+    @staticmethod
+    def _winner_key(winner: str) -> str:
+        """Normalize a winner line so "**Poem A**" and "Poem A (Google Poet)" vote together."""
+        match = _WINNER_POEM_RE.search(winner)
+        return f"Poem {match.group(1).upper()}" if match else winner.strip().lower()
+    
+    def _build_chain(self):
+        """Create the prompt | llm | parser chain for judging."""
+        return self._prompt | self.llm | self.output_parser
+    
+    def _build_prompt(self) -> ChatPromptTemplate:
+        """Create the judging prompt."""
+        return ChatPromptTemplate.from_messages([
             ("system", """You are an expert poetry critic and judge. Evaluate two poems based on:
 
 JUDGING CRITERIA (Total: 100 points):
@@ -209,24 +508,10 @@ Context: {context}
 
 Judge these poems.""")
         ])
-        
-        chain = prompt | self.llm | self.output_parser
-        judgment = chain.invoke({
-            "facts": facts,
-            "poem_a": poem_a,
-            "poem_b": poem_b,
-            "context": context
-        })
-        
-        # Parse judgment
-        result = self._parse_judgment(judgment)
-        result["full_judgment"] = judgment
-        
-        return result
     
-    def _parse_judgment(self, judgment: str) -> Dict[str, any]:
+    @staticmethod
+    def _parse_judgment(judgment: str) -> Dict[str, any]:
         """Parse the judgment text into structured data."""
-        lines = judgment.strip().split('\n')
         result = {
             "poem_a_scores": {},
             "poem_b_scores": {},
@@ -236,17 +521,27 @@ Judge these poems.""")
             "total_b": 0
         }
         
-        try:
-            # Extract scores (simplified parsing)
-            for line in lines:
-                if "WINNER:" in line:
-                    result["winner"] = line.split("WINNER:")[1].strip()
-                elif "TOTAL:" in line and "poem_a_scores" not in str(result["total_a"]):
-                    if result["total_a"] == 0:
-                        result["total_a"] = int(line.split(":")[1].split("/")[0].strip())
-                    else:
-                        result["total_b"] = int(line.split(":")[1].split("/")[0].strip())
-        except:
-            pass  # Return partial results if parsing fails
-        
-        return result
\ No newline at end of file
+        # Totals appear in order: Poem A first, then Poem B; stop after the second
+        totals = list(islice(_TOTAL_RE.finditer(judgment), 2))
+        if len(totals) > 0:
+            result["total_a"] = int(totals[0].group(1))
+        if len(totals) > 1:
+            result["total_b"] = int(totals[1].group(1))
+        
+        # The winner line follows the scores, so only search the tail
+        winner = _WINNER_RE.search(judgment, totals[-1].end() if totals else 0)
+        if winner:
+            result["winner"] = winner.group(1).strip().rstrip("*").strip()
+        
+        justification = _JUSTIFICATION_RE.search(judgment)
+        if justification:
+            result["justification"] = justification.group(1).strip()
+        
+        # Criterion scores before the Poem B header belong to Poem A
+        poem_b_start = judgment.find("POEM B SCORES:")
+        for match in _SCORES_RE.finditer(judgment):
+            in_a = poem_b_start == -1 or match.start() < poem_b_start
+            scores = result["poem_a_scores"] if in_a else result["poem_b_scores"]
+            scores.setdefault(match.group(1), int(match.group(2)))
+        
+        return result
@@ -1,13 +1,17 @@
+import asyncio
 from typing import List, Dict, TypedDict
 from langgraph.graph import StateGraph, END, START
-from poem_agents import GooglePoemAgent, GroqPoemAgent, JudgeAgent
+from poem_agents import GooglePoemAgent, GroqPoemAgent, JudgeAgent, enable_llm_cache
 
 
 class PoemState(TypedDict):
     """State for the poem generation workflow."""
     context: str
+    facts: str  # Source facts shared with the judge, retrieved once per run
     google_verses: List[str]
     groq_verses: List[str]
+    all_verses: List[str]  # Both agents' verses in poem order
+    conversation_lines: List[str]  # "Line N: verse" history, appended as verses arrive
     current_verse_count: int
     total_verses: int
     judgment: Dict[str, any]
@@ -20,6 +24,7 @@ class PoemWorkflow:
     def __init__(self, retriever, num_verses: int = 6):
         self.retriever = retriever
         self.num_verses = num_verses
+        enable_llm_cache()
         
         # Initialize agents
         self.google_agent = GooglePoemAgent(retriever)
@@ -34,25 +39,16 @@ class PoemWorkflow:
         workflow = StateGraph(PoemState)
         
         # Add nodes
-        workflow.add_node("google_generates", self._google_generates)
-        workflow.add_node("groq_generates", self._groq_generates)
+        workflow.add_node("both_generate", self._both_generate)
         workflow.add_node("judge_poems", self._judge_poems)
         
         # Add edges
-        workflow.add_edge(START, "google_generates")
+        workflow.add_edge(START, "both_generate")
         workflow.add_conditional_edges(
-            "google_generates",
+            "both_generate",
             self._check_verse_count,
             {
-                "continue": "groq_generates",
-                "judge": "judge_poems"
-            }
-        )
-        workflow.add_conditional_edges(
-            "groq_generates",
-            self._check_verse_count,
-            {
-                "continue": "google_generates",
+                "continue": "both_generate",
                 "judge": "judge_poems"
             }
         )
@@ -60,44 +56,60 @@ class PoemWorkflow:
         
         return workflow.compile()
     
-    def _google_generates(self, state: PoemState) -> PoemState:
-        """Google agent generates a verse."""
-        print(f"\n🌟 Google Poet generating verse {state['current_verse_count'] + 1}...")
-        
-        verse = self.google_agent.generate_verse(
+    async def _both_generate(self, state: PoemState) -> PoemState:
+        """Google and Groq agents each generate a verse for this round, concurrently."""
+        verse_number = state["current_verse_count"] + 1
+        if not state["facts"]:
+            # Reuse the verse retrieval for the judge instead of querying again
+            state["facts"] = await asyncio.to_thread(
+                self.google_agent.retrieve_facts, state["context"], 3
+            )
+        conversation = "\n".join(state["conversation_lines"])
+        
+        print(f"\n🌟 Google Poet generating verse {verse_number}...")
+        tasks = [self.google_agent.agenerate_verse(
             context=state["context"],
-            previous_verses=state["google_verses"] + state["groq_verses"]
-        )
-        
-        state["google_verses"].append(verse)
-        state["current_verse_count"] += 1
-        
-        print(f"   Google: {verse}")
+            previous_verses=state["all_verses"],
+            conversation=conversation
+        )]
+        
+        # With an odd target the final round only needs Google's verse
+        if state["total_verses"] - state["current_verse_count"] >= 2:
+            print(f"\n⚡ Groq Poet generating verse {verse_number + 1}...")
+            tasks.append(self.groq_agent.agenerate_verse(
+                context=state["context"],
+                previous_verses=state["all_verses"],
+                conversation=conversation
+            ))
+        
+        # Both providers are waited on at once, so a round costs the slower call
+        verses = await asyncio.gather(*tasks)
+        
+        state["google_verses"].append(verses[0])
+        print(f"   Google: {verses[0]}")
+        if len(verses) > 1:
+            state["groq_verses"].append(verses[1])
+            print(f"   Groq: {verses[1]}")
+        
+        # Format each verse once; later rounds reuse the stored lines
+        for verse in verses:
+            state["all_verses"].append(verse)
+            state["conversation_lines"].append(
+                f"Line {len(state['all_verses'])}: {verse}"
+            )
+        
+        state["current_verse_count"] += len(verses)
         return state
     
-    def _groq_generates(self, state: PoemState) -> PoemState:
-        """Groq agent generates a verse."""
-        print(f"\n⚡ Groq Poet generating verse {state['current_verse_count'] + 1}...")
-        
-        verse = self.groq_agent.generate_verse(
-            context=state["context"],
-            previous_verses=state["google_verses"] + state["groq_verses"]
-        )
-        
-        state["groq_verses"].append(verse)
-        state["current_verse_count"] += 1
-        
-        print(f"   Groq: {verse}")
-        return state
-    
-    def _judge_poems(self, state: PoemState) -> PoemState:
+    async def _judge_poems(self, state: PoemState) -> PoemState:
         """Judge agent evaluates both poems."""
         print("\n⚖️  Judge evaluating poems...")
         
-        judgment = self.judge_agent.judge_verses(
+        judgment = await self.judge_agent.ajudge_verses(
             verses_a=state["google_verses"],
             verses_b=state["groq_verses"],
-            context=state["context"]
+            context=state["context"],
+            facts=state["facts"]
         )
         
         state["judgment"] = judgment
@@ -115,6 +127,18 @@ class PoemWorkflow:
         """
         Run the complete poem generation and judging workflow.
         
+        Args:
+            context: Theme or context for the poem
+            
+        Returns:
+            Complete results including poems and judgment
+        """
+        return asyncio.run(self.arun(context))
+    
+    async def arun(self, context: str) -> Dict[str, any]:
+        """
+        Async version of run, for callers that already have an event loop.
+        
         Args:
             context: Theme or context for the poem
             
@@ -124,8 +148,11 @@ class PoemWorkflow:
         # Initialize state
         initial_state: PoemState = {
             "context": context,
+            "facts": "",
             "google_verses": [],
             "groq_verses": [],
+            "all_verses": [],
+            "conversation_lines": [],
             "current_verse_count": 0,
             "total_verses": self.num_verses,
             "judgment": {},
@@ -139,7 +166,7 @@ class PoemWorkflow:
         print(f"📊 Target verses: {self.num_verses}")
         print(f"{'='*60}")
         
-        final_state = self.workflow.invoke(initial_state)
+        final_state = await self.workflow.ainvoke(initial_state)
         
         # Format results
         results = {
@@ -4,9 +4,15 @@ Run this after setup to ensure everything is working.
 """
 
 import os
+import re
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Imports are independent and mostly wait on disk / dlopen, so run them concurrently
+IMPORT_WORKERS = 8
+
 
 def test_imports():
     """Test if all required packages can be imported."""
@@ -27,13 +33,17 @@ def test_imports():
     ]
     
     failed = []
-    for module, package in packages:
-        try:
-            __import__(module)
-            print(f"  ✅ {package}")
-        except ImportError:
-            print(f"  ❌ {package} - FAILED")
-            failed.append(package)
+    with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        futures = {executor.submit(__import__, module): package
+                   for module, package in packages}
+        for future in as_completed(futures):
+            package = futures[future]
+            try:
+                future.result()
+                print(f"  ✅ {package}")
+            except ImportError:
+                print(f"  ❌ {package} - FAILED")
+                failed.append(package)
     
     if failed:
         print(f"\n❌ Failed imports: {', '.join(failed)}")
@@ -73,8 +83,13 @@ def test_environment():
         return True
 
 
-def test_external_tools():
-    """Test if external tools are available."""
+def test_external_tools(verify: bool = False):
+    """
+    Test if external tools are available.
+    
+    Args:
+        verify: Also run each tool with --version instead of only finding it on PATH
+    """
     print("\n🔧 Testing external tools...")
     
     import subprocess
@@ -87,10 +102,14 @@ def test_external_tools():
     all_ok = True
     for tool, description in tools.items():
         try:
-            subprocess.run([tool, "--version"], 
-                          stdout=subprocess.PIPE, 
-                          stderr=subprocess.PIPE,
-                          check=True)
+            # A PATH lookup is enough by default; spawning the tool is opt-in
+            if shutil.which(tool) is None:
+                raise FileNotFoundError(tool)
+            if verify:
+                subprocess.run([tool, "--version"], 
+                              stdout=subprocess.PIPE, 
+                              stderr=subprocess.PIPE,
+                              check=True)
             print(f"  ✅ {tool} - {description}")
         except (subprocess.CalledProcessError, FileNotFoundError):
             print(f"  ⚠️  {tool} - NOT FOUND (optional)")
@@ -115,13 +134,16 @@ def test_module_imports():
     ]
     
     failed = []
-    for module in modules:
-        try:
-            __import__(module)
-            print(f"  ✅ {module}.py")
-        except Exception as e:
-            print(f"  ❌ {module}.py - {str(e)}")
-            failed.append(module)
+    with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        futures = {executor.submit(__import__, module): module for module in modules}
+        for future in as_completed(futures):
+            module = futures[future]
+            try:
+                future.result()
+                print(f"  ✅ {module}.py")
+            except Exception as e:
+                print(f"  ❌ {module}.py - {str(e)}")
+                failed.append(module)
     
     if failed:
         print(f"\n❌ Failed modules: {', '.join(failed)}")
@@ -136,8 +158,11 @@ def test_embedding_model():
     print("\n🤖 Testing embedding model...")
     
     try:
-        from langchain_huggingface import HuggingFaceEmbeddings
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        # Same process-wide instance VectorStoreManager uses, so the FAISS
+        # test below doesn't load the model a second time
+        from vector_store_manager import _get_embeddings
+        from config import EMBEDDING_MODEL
+        embeddings = _get_embeddings(EMBEDDING_MODEL)
         
         # Test embedding
         test_text = "This is a test sentence."
@@ -165,7 +190,8 @@ def test_google_api():
         llm = ChatGoogleGenerativeAI(
             model=GOOGLE_MODEL,
             google_api_key=GOOGLE_API_KEY,
-            temperature=0.1
+            temperature=0.1,
+            cache=False  # Always hit the API, even if an LLM cache is registered
         )
         
         response = llm.invoke("Say 'test successful' in exactly those words")
@@ -192,7 +218,8 @@ def test_groq_api():
         llm = ChatGroq(
             groq_api_key=GROQ_API_KEY,
             model_name=GROQ_MODEL,
-            temperature=0.1
+            temperature=0.1,
+            cache=False  # Always hit the API, even if an LLM cache is registered
         )
         
         response = llm.invoke("Say 'test successful' in exactly those words")
@@ -238,6 +265,110 @@ def test_faiss_vector_store():
         return False
 
 
+def test_faiss_incremental_retrieval():
+    """Test that an index started with one document still ranks later additions."""
+    print("\n🔎 Testing FAISS retrieval after incremental adds...")
+    
+    import tempfile
+    
+    try:
+        from vector_store_manager import VectorStoreManager
+        from langchain_core.documents import Document
+        
+        topics = [
+            "The cat curled up asleep on the warm windowsill.",
+            "Volcanoes erupt when magma rises through the Earth's crust.",
+            "The stock market fell sharply after the interest rate announcement.",
+            "Photosynthesis lets plants turn sunlight into chemical energy.",
+        ]
+        queries = [
+            "sleeping kitten",
+            "lava and eruptions",
+            "finance and shares",
+            "how plants make food from light",
+        ]
+        
+        # Separate directory so the real index is never touched
+        with tempfile.TemporaryDirectory() as persist_directory:
+            # First run indexes a single document...
+            vector_store = VectorStoreManager(persist_directory=persist_directory)
+            vector_store.add_documents([Document(page_content=topics[0], metadata={"source": "test"})])
+            
+            # ...a later run reloads it from disk and adds the rest
+            vector_store = VectorStoreManager(persist_directory=persist_directory)
+            vector_store.add_documents([Document(page_content=text, metadata={"source": "test"})
+                                        for text in topics[1:]])
+            
+            wrong = []
+            for query, expected in zip(queries, topics):
+                top = vector_store.similarity_search(query, k=1)[0].page_content
+                if top != expected:
+                    wrong.append(query)
+        
+        if wrong:
+            print(f"  ❌ Wrong top result for: {', '.join(wrong)}")
+            return False
+        
+        print(f"  ✅ Top result correct for all {len(queries)} queries")
+        return True
+    except Exception as e:
+        print(f"  ❌ Failed: {str(e)}")
+        return False
+
+
+def test_judgment_parsing():
+    """Test that judge output is parsed with and without markdown decoration."""
+    print("\n⚖️  Testing judgment parsing...")
+    
+    try:
+        from poem_agents import JudgeAgent
+        
+        plain = """POEM A SCORES:
+Factual Accuracy: 25/30
+Literary Quality: 20/25
+Coherence: 15/20
+Creativity: 12/15
+Rhythm & Sound: 8/10
+TOTAL: 80/100
+
+POEM B SCORES:
+Factual Accuracy: 22/30
+Literary Quality: 19/25
+Coherence: 16/20
+Creativity: 11/15
+Rhythm & Sound: 8/10
+TOTAL: 76/100
+
+WINNER: Poem A
+
+JUSTIFICATION:
+Poem A stays closer to the facts.
+
+STRENGTHS OF WINNER:
+- Vivid imagery"""
+        
+        # Same judgment with the markdown the models like to add
+        decorated = re.sub(r"^([A-Za-z &]+:)", r"**\1**", plain, flags=re.MULTILINE)
+        decorated = decorated.replace("Poem A\n", "**Poem A**\n")
+        
+        failed = []
+        for name, text in [("plain", plain), ("markdown", decorated)]:
+            result = JudgeAgent._parse_judgment(text)
+            ok = (result["total_a"] == 80 and result["total_b"] == 76
+                  and result["winner"] == "Poem A"
+                  and result["poem_a_scores"].get("Factual Accuracy") == 25
+                  and result["poem_b_scores"].get("Factual Accuracy") == 22
+                  and result["justification"] == "Poem A stays closer to the facts.")
+            print(f"  {'✅' if ok else '❌'} {name} judgment")
+            if not ok:
+                failed.append(name)
+        
+        return not failed
+    except Exception as e:
+        print(f"  ❌ Failed: {str(e)}")
+        return False
+
+
 def test_document_processing():
     """Test document processing with sample text."""
     print("\n📄 Testing document processing...")
@@ -296,8 +427,13 @@ responsibility remains a crucial challenge for the field."""
     return sample_file
 
 
-def run_all_tests():
-    """Run all tests and provide summary."""
+def run_all_tests(verify_tools: bool = False):
+    """
+    Run all tests and provide summary.
+    
+    Args:
+        verify_tools: Run external tools instead of only checking they're on PATH
+    """
     print("="*60)
     print("🧪 AI POEM GENERATOR - SYSTEM TEST")
     print("="*60)
@@ -305,12 +441,14 @@ def run_all_tests():
     tests = [
         ("Package Imports", test_imports),
         ("Environment Variables", test_environment),
-        ("External Tools", test_external_tools),
+        ("External Tools", lambda: test_external_tools(verify=verify_tools)),
         ("Custom Modules", test_module_imports),
         ("Embedding Model", test_embedding_model),
         ("Google API", test_google_api),
         ("Groq API", test_groq_api),
         ("FAISS Vector Store", test_faiss_vector_store),
+        ("FAISS Incremental Retrieval", test_faiss_incremental_retrieval),
+        ("Judgment Parsing", test_judgment_parsing),
         ("Document Processing", test_document_processing),
     ]
     
@@ -359,5 +497,5 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    success = run_all_tests(verify_tools="--verify-tools" in sys.argv[1:])
     sys.exit(0 if success else 1)
\ No newline at end of file
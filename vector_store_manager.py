@@ -1,14 +1,79 @@
+import hashlib
 import os
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List
+import faiss
+import numpy as np
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
-from config import EMBEDDING_MODEL, VECTOR_STORE_TABLE
+from langchain_core.embeddings import Embeddings
+from config import (EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_DEVICE, EMBEDDING_CACHE_SIZE,
+                    QUERY_EMBEDDING_CACHE_SIZE, VECTOR_STORE_TABLE, FAISS_HNSW_M, FAISS_HNSW_EF_CONSTRUCTION,
+                    FAISS_HNSW_EF_SEARCH)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that memoizes query vectors."""
+    
+    def __init__(self, inner: Embeddings, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE):
+        """
+        Wrap an embedding model.
+        
+        Args:
+            inner: Embedding model doing the actual work
+            maxsize: Number of query vectors to keep
+        """
+        self.inner = inner
+        # Tuples keep cached vectors immutable; callers get a fresh list
+        self._embed_query = lru_cache(maxsize=maxsize)(
+            lambda text: tuple(inner.embed_query(text))
+        )
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents (not cached here; see VectorStoreManager._embed_documents)."""
+        return self.inner.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, reusing the vector if the same text was seen before."""
+        return list(self._embed_query(text))
+
+
+@lru_cache(maxsize=1)
+def _get_embeddings(model_name: str) -> CachedEmbeddings:
+    """
+    Load the embedding model once per process.
+    
+    Loading reads the SentenceTransformer weights from disk and initializes
+    torch, so every VectorStoreManager shares the same instance (and with it
+    the query-vector cache). The model is warmed up here so the first real
+    query doesn't pay for tokenizer and kernel initialization.
+    
+    Args:
+        model_name: SentenceTransformer model to load
+        
+    Returns:
+        Shared embedding model
+    """
+    model = HuggingFaceEmbeddings(
+        model_name=model_name,
+        encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE, "normalize_embeddings": True},
+        model_kwargs={"device": EMBEDDING_DEVICE}
+    )
+    # Warm up on the bare model so the dummy vector stays out of the query cache
+    model.embed_query("warmup")
+    
+    return CachedEmbeddings(model)
 
 
 class VectorStoreManager:
     """Manage vector store operations with FAISS."""
     
+    # LRU of content hash -> embedding, shared so repeated ingests skip the model
+    _embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+    
     def __init__(self, persist_directory: str = "faiss_index"):
         """
         Initialize FAISS vector store.
@@ -22,8 +87,8 @@ class VectorStoreManager:
         # Create directory if it doesn't exist
         os.makedirs(persist_directory, exist_ok=True)
         
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        # Initialize embeddings (loaded once and shared by every manager)
+        self.embeddings = _get_embeddings(EMBEDDING_MODEL)
         
         # Initialize or load vector store
         if os.path.exists(self.index_path) and os.path.isdir(self.index_path):
@@ -33,6 +98,8 @@ class VectorStoreManager:
                 self.embeddings,
                 allow_dangerous_deserialization=True
             )
+            if hasattr(self.vector_store.index, "hnsw"):
+                self.vector_store.index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
             print(f"✅ Loaded existing FAISS index from {self.index_path}")
         else:
             # Create new empty index (will be populated when documents are added)
@@ -49,13 +116,18 @@ class VectorStoreManager:
         Returns:
             Number of documents added
         """
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+        text_embeddings = list(zip(texts, self._embed_documents(documents)))
+        
         if self.vector_store is None:
             # Create new FAISS index from documents
-            self.vector_store = FAISS.from_documents(documents, self.embeddings)
+            self.vector_store = self._create_vector_store(len(text_embeddings[0][1]))
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
             print(f"✅ Created new FAISS index with {len(documents)} documents")
         else:
             # Add documents to existing index
-            self.vector_store.add_documents(documents)
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
             print(f"✅ Added {len(documents)} documents to existing index")
         
         # Save the index
@@ -63,6 +135,74 @@ class VectorStoreManager:
         
         return len(documents)
     
+    def _create_vector_store(self, dimension: int) -> FAISS:
+        """
+        Create an empty FAISS store backed by an 8-bit quantized HNSW graph index.
+        
+        HNSW searches in sub-linear time, whereas the default flat index scans
+        every vector, at the cost of a small recall loss. Scalar quantization
+        stores each dimension in one byte instead of four, so distance
+        computations touch a quarter of the memory.
+        
+        The quantizer is fitted to [-1, 1] in every dimension, the range of the
+        normalized embeddings, rather than to the first batch. A batch's own
+        min/max would be degenerate for one or two documents, and the index is
+        reloaded and extended on later runs.
+        
+        Args:
+            dimension: Embedding dimension
+            
+        Returns:
+            Empty FAISS vector store
+        """
+        bounds = np.array([[-1.0] * dimension, [1.0] * dimension], dtype=np.float32)
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, FAISS_HNSW_M)
+        index.train(bounds)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+        
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={}
+        )
+    
+    def _embed_documents(self, documents: List[Document]) -> List[List[float]]:
+        """
+        Embed documents, reusing cached vectors and batch-encoding only the misses.
+        
+        Args:
+            documents: List of Document objects
+            
+        Returns:
+            One embedding per document, in order
+        """
+        cache = VectorStoreManager._embedding_cache
+        hashes = [
+            doc.metadata.get("hash") or hashlib.blake2b(
+                doc.page_content.encode("utf-8"), digest_size=16
+            ).hexdigest()
+            for doc in documents
+        ]
+        
+        # Deduplicate misses so identical chunks are only encoded once
+        misses = {h: doc.page_content for h, doc in zip(hashes, documents) if h not in cache}
+        if misses:
+            vectors = self.embeddings.embed_documents(list(misses.values()))
+            cache.update(zip(misses.keys(), vectors))
+        
+        embeddings = []
+        for h in hashes:
+            cache.move_to_end(h)
+            embeddings.append(cache[h])
+        
+        # Evict least recently used entries beyond the cache size
+        while len(cache) > EMBEDDING_CACHE_SIZE:
+            cache.popitem(last=False)
+        
+        return embeddings
+    
     def get_retriever(self, search_kwargs: dict = None):
         """
         Get a retriever for the vector store.
@@ -95,7 +235,25 @@ class VectorStoreManager:
         if self.vector_store is None:
             raise ValueError("Vector store is empty. Add documents first.")
         
-        return self.vector_store.similarity_search(query, k=k)
+        return self.similarity_search_with_cached_embedding(query, k=k)
+    
+    def similarity_search_with_cached_embedding(self, query: str, k: int = 4) -> List[Document]:
+        """
+        Perform similarity search, handing FAISS a cached query vector.
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            
+        Returns:
+            List of similar documents
+        """
+        if self.vector_store is None:
+            raise ValueError("Vector store is empty. Add documents first.")
+        
+        return self.vector_store.similarity_search_by_vector(
+            self.embeddings.embed_query(query), k=k
+        )
     
     def save(self):
         """Save the FAISS index to disk."""